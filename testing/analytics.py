@@ -0,0 +1,362 @@
+# SKYBRIDGE — Delay analytics
+#
+# One observation per landed flight (flight_no + flight_date), grouped by
+# route, airline and scheduled departure hour. Each group keeps a
+# 1-minute delay histogram, so percentiles cost O(bins) no matter how
+# many observations have been folded in. Older flights fade out with a
+# configurable half-life (rolling window).
+
+import time
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+# histogram range in minutes, values outside are clamped to the edges
+BIN_MIN = -60
+BIN_MAX = 600
+BINS = BIN_MAX - BIN_MIN + 1
+
+PERCENTILES = (50, 75, 90, 95)
+
+DIMENSIONS = ("route", "airline", "hour")
+METRICS = ("dep_delay", "arr_delay")
+
+# below this (decayed) sample weight a group is too thin to predict from
+MIN_SAMPLES = 5
+
+# Columns loaded by TAIL_SQL, in row order
+COLUMNS = (
+    "id",
+    "flight_date",
+    "airline",
+    "dep_airport",
+    "arr_airport",
+    "dep_hour",
+    "dep_delay",
+    "arr_delay"
+)
+
+
+# observations newer than the last one ingested (%s = last id)
+TAIL_SQL = (
+    "SELECT " + ", ".join(COLUMNS) +
+    " FROM delay_observations WHERE id > %s ORDER BY id"
+)
+
+
+# -------------------------------------------------
+# OBSERVATIONS
+# -------------------------------------------------
+
+def observation_from_flight(callsign, flight_obj):
+    # AviationStack record → insert tuple, None if nothing usable
+    departure = flight_obj.get("departure") or {}
+    arrival = flight_obj.get("arrival") or {}
+    airline = flight_obj.get("airline") or {}
+
+    flight_date = parse_day(flight_obj.get("flight_date"))
+    if flight_date is None:
+        return None
+
+    dep_delay = departure.get("delay")
+    arr_delay = arrival.get("delay")
+
+    if arr_delay is None:
+        arr_delay = minutes_between(arrival.get("scheduled"), arrival.get("actual"))
+
+    if dep_delay is None and arr_delay is None:
+        return None
+
+    scheduled = departure.get("scheduled") or ""
+    dep_hour = int(scheduled[11:13]) if scheduled[11:13].isdigit() else None
+
+    return (
+        callsign,
+        flight_date.isoformat(),
+        (airline.get("iata") or callsign[:2]).upper(),
+        (departure.get("iata") or "").upper(),
+        (arrival.get("iata") or "").upper(),
+        dep_hour,
+        dep_delay,
+        arr_delay
+    )
+
+
+def parse_day(value):
+    # ISO date (str or date) → date, None if unusable
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def minutes_between(start, end):
+    if not start or not end:
+        return None
+
+    try:
+        delta = datetime.fromisoformat(end) - datetime.fromisoformat(start)
+    except (TypeError, ValueError):
+        return None
+
+    return int(delta.total_seconds() // 60)
+
+
+def route_key(from_airport, to_airport):
+    if not from_airport or not to_airport:
+        return None
+    return f"{from_airport.strip().upper()}-{to_airport.strip().upper()}"
+
+
+# -------------------------------------------------
+# HISTOGRAMS
+# -------------------------------------------------
+
+class HistogramTable:
+
+    def __init__(self):
+        self.rows = {}       # group key -> row index
+        self.labels = []
+        self.size = 0
+
+        self.hist = np.zeros((16, BINS))
+        self.weight = np.zeros(16)
+        self.total = np.zeros(16)   # weighted sum of (clamped) delays
+
+        self.summary = self._summarize()
+
+    def row_indices(self, keys):
+        out = np.empty(len(keys), dtype=np.intp)
+
+        for i, key in enumerate(keys):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.rows[key] = self.size
+                self.labels.append(key)
+                self.size += 1
+            out[i] = row
+
+        if self.size > len(self.weight):
+            self._grow(self.size)
+
+        return out
+
+    def add(self, keys, values, weights):
+        keep = ~np.isnan(values)
+        if not keep.any():
+            return
+
+        values = np.clip(np.rint(values[keep]), BIN_MIN, BIN_MAX)
+        weights = weights[keep]
+        rows = self.row_indices([k for k, ok in zip(keys, keep) if ok])
+        bins = (values - BIN_MIN).astype(np.intp)
+
+        np.add.at(self.hist, (rows, bins), weights)
+        np.add.at(self.weight, rows, weights)
+        np.add.at(self.total, rows, values * weights)
+
+    def decay(self, factor):
+        if factor >= 1:
+            return
+        self.hist[:self.size] *= factor
+        self.weight[:self.size] *= factor
+        self.total[:self.size] *= factor
+
+    def refresh(self):
+        self.summary = self._summarize()
+
+    def _grow(self, needed):
+        capacity = len(self.weight)
+        while capacity < needed:
+            capacity *= 2
+
+        extra = capacity - len(self.weight)
+        self.hist = np.vstack([self.hist, np.zeros((extra, BINS))])
+        self.weight = np.concatenate([self.weight, np.zeros(extra)])
+        self.total = np.concatenate([self.total, np.zeros(extra)])
+
+    def _summarize(self):
+        n = self.size
+        weight = self.weight[:n]
+
+        # first bin whose cumulative weight reaches each percentile, all groups at once
+        cum = np.cumsum(self.hist[:n], axis=1)
+        targets = weight[:, None] * (np.array(PERCENTILES) / 100.0)[None, :]
+        idx = (cum[:, :, None] >= targets[:, None, :]).argmax(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.total[:n] / weight
+
+        return {
+            "labels": list(self.labels),
+            "samples": weight.copy(),
+            "mean": mean,
+            "percentiles": (idx + BIN_MIN).astype(float)
+        }
+
+
+# -------------------------------------------------
+# ENGINE
+# -------------------------------------------------
+
+class DelayAnalytics:
+
+    def __init__(self, half_life_days=30):
+        self.half_life_days = half_life_days
+        self.tables = {(d, m): HistogramTable() for d in DIMENSIONS for m in METRICS}
+
+        self.last_id = 0
+        self.observations = 0
+        self.as_of = None
+        self.refreshed_at = 0.0
+
+        self._lock = threading.Lock()
+
+    def ingest(self, rows, today=None):
+        # fold a batch of COLUMNS rows into every table
+        today = today or date.today()
+
+        with self._lock:
+            self._age_to(today)
+            self.refreshed_at = time.time()
+
+            if not rows:
+                return 0
+
+            # a bad flight_date must not wedge the tail: skip the row,
+            # still move last_id past it
+            last_id = max(r[0] for r in rows)
+            days = [parse_day(r[1]) for r in rows]
+            good = [r for r, d in zip(rows, days) if d is not None]
+
+            if len(good) < len(rows):
+                print("Analytics skipped", len(rows) - len(good), "observations with a bad flight_date")
+
+            if not good:
+                self.last_id = max(self.last_id, last_id)
+                return 0
+
+            cols = list(zip(*good))
+            airlines, deps, arrs, hours = cols[2:6]
+
+            ages = (
+                np.datetime64(today, "D") -
+                np.array([d for d in days if d is not None], dtype="datetime64[D]")
+            ).astype(float)
+            weights = 0.5 ** (np.clip(ages, 0, None) / self.half_life_days)
+
+            keys = {
+                "route": [route_key(a, b) for a, b in zip(deps, arrs)],
+                "airline": list(airlines),
+                "hour": list(hours)
+            }
+
+            for metric, values in zip(METRICS, cols[6:]):
+                values = np.array(values, dtype=float)
+
+                for dim in DIMENSIONS:
+                    dim_keys = keys[dim]
+                    known = np.array([k is not None and k != "" for k in dim_keys])
+                    if not known.any():
+                        continue
+
+                    table = self.tables[(dim, metric)]
+                    table.add(
+                        [k for k, ok in zip(dim_keys, known) if ok],
+                        values[known],
+                        weights[known]
+                    )
+
+            for table in self.tables.values():
+                table.refresh()
+
+            self.last_id = max(self.last_id, last_id)
+            self.observations += len(good)
+
+            return len(good)
+
+    def _age_to(self, today):
+        if self.as_of is not None and today > self.as_of:
+            days = (today - self.as_of).days
+            factor = 0.5 ** (days / self.half_life_days)
+
+            for table in self.tables.values():
+                table.decay(factor)
+                table.refresh()
+
+        if self.as_of is None or today > self.as_of:
+            self.as_of = today
+
+    # -------------------- QUERIES --------------------
+
+    def groups(self, dim, metric, limit=50):
+        summary = self.tables[(dim, metric)].summary
+        order = np.argsort(-summary["samples"])[:limit]
+
+        out = []
+        for i in order:
+            if summary["samples"][i] <= 0:
+                continue
+
+            row = {
+                "key": summary["labels"][i],
+                "samples": round(float(summary["samples"][i]), 2),
+                "mean": round(float(summary["mean"][i]), 1)
+            }
+            for p, value in zip(PERCENTILES, summary["percentiles"][i]):
+                row[f"p{p}"] = float(value)
+            out.append(row)
+
+        return out
+
+    def lookup(self, dim, metric, key):
+        summary = self.tables[(dim, metric)].summary
+        row = self.tables[(dim, metric)].rows.get(key)
+
+        if row is None or row >= len(summary["labels"]):
+            return None
+
+        if summary["samples"][row] < MIN_SAMPLES:
+            return None
+
+        return summary, row
+
+    def predict(self, route, airline, hour, metric="arr_delay"):
+        # most specific group with enough history wins
+        for dim, key in (("route", route), ("airline", airline), ("hour", hour)):
+            if key is None:
+                continue
+
+            found = self.lookup(dim, metric, key)
+            if not found:
+                continue
+
+            summary, row = found
+            p = dict(zip(PERCENTILES, summary["percentiles"][row].tolist()))
+
+            return {
+                "basis": dim,
+                "basis_key": key,
+                "samples": round(float(summary["samples"][row]), 2),
+                "p50": p[50],
+                "p90": p[90]
+            }
+
+        return None
+
+
+def shift_hhmm(hhmm, minutes):
+    # "23:40" + 45 → "00:25"
+    try:
+        h, m = int(hhmm[:2]), int(hhmm[3:5])
+    except (TypeError, ValueError):
+        return None
+
+    total = (h * 60 + m + int(minutes)) % (24 * 60)
+    return f"{total // 60:02d}:{total % 60:02d}"
@@ -1,39 +1,111 @@
-# --- Python 3.14 Fix for Flask ---
-import pkgutil, importlib
-if not hasattr(pkgutil, "get_loader"):
-    def get_loader(name):
-        try:
-            return importlib.util.find_spec(name)
-        except:
-            return None
-    pkgutil.get_loader = get_loader
 # SKYBRIDGE — Executive Flight Intelligence Backend (Production)
+#
+# Importing this module has no side effects: settings, the DB backend,
+# the upstream client and the fleet index are all set up lazily.
+#
+#   gunicorn "app:create_app()"     (or app:APP, see gunicorn.conf.py)
+#   flask --app app migrate         create tables, once per deploy
 
 import os
 import sqlite3
-import requests
-import urllib3
-import psycopg2
+import time
+import threading
 from urllib.parse import urlparse
-from flask import Flask, render_template, request, jsonify
-from dotenv import load_dotenv
+from flask import Flask, Blueprint, render_template, request, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import replay
+from fleet_index import FleetIndex, WARM_SQL
+from serialization import json_response, shape_rows
+from ratelimit import RateLimiter, UpstreamGate, Counters
 
 # -------------------------------------------------
-# ENV
+# ENV (filled in by load_settings)
 # -------------------------------------------------
-load_dotenv()
-AVIATION_KEY = os.getenv("AVIATIONSTACK_API_KEY", "").strip()
-TEAMS_WEBHOOK = os.getenv("TEAMS_WEBHOOK")
+AVIATION_KEY = ""
+TEAMS_WEBHOOK = None
+
+# Upstream record / replay (live | record | replay)
+REPLAY_MODE = "live"
+REPLAY_DIR = "recordings"
+REPLAY_SPEED = 1.0
+
+# Active fleet index resync interval (seconds, 0 disables)
+FLEET_RECONCILE_SECONDS = 300
+
+# /api/flight admission control (requests per minute / burst, 0 disables).
+# Buckets and the upstream cap live in each worker process: rates are
+# configured for the whole deployment and divided by WEB_CONCURRENCY
+# (set by gunicorn.conf.py to the real worker count, 1 for `python app.py`),
+# UPSTREAM_MAX_IN_FLIGHT is per worker and needs threaded workers
+# (gunicorn.conf.py) to ever be reached.
+WEB_CONCURRENCY = 1
+CLIENT_RATE_PER_MIN = 60
+CLIENT_RATE_BURST = 20
+CALLSIGN_RATE_PER_MIN = 20
+CALLSIGN_RATE_BURST = 5
+UPSTREAM_MAX_IN_FLIGHT = 4
+
+# reverse proxies in front of the app whose X-Forwarded-For is trusted.
+# 0 = none: only set it when a proxy really sits in front, otherwise a
+# client can forge X-Forwarded-For and get a fresh rate limit bucket
+TRUSTED_PROXY_HOPS = 0
+
+# Delay analytics: rolling half-life and how often to pull new observations
+ANALYTICS_HALF_LIFE_DAYS = 30
+ANALYTICS_REFRESH_SECONDS = 60
 
 #For production, set DATABASE_URL to a PostgreSQL connection string
-DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_URL = None
+
+_SETTINGS_LOADED = False
+
+def load_settings():
+    global AVIATION_KEY, TEAMS_WEBHOOK, DATABASE_URL, _SETTINGS_LOADED
+    global REPLAY_MODE, REPLAY_DIR, REPLAY_SPEED, FLEET_RECONCILE_SECONDS
+    global WEB_CONCURRENCY, TRUSTED_PROXY_HOPS, CLIENT_RATE_PER_MIN, CLIENT_RATE_BURST
+    global CALLSIGN_RATE_PER_MIN, CALLSIGN_RATE_BURST, UPSTREAM_MAX_IN_FLIGHT
+    global ANALYTICS_HALF_LIFE_DAYS, ANALYTICS_REFRESH_SECONDS
+
+    if _SETTINGS_LOADED:
+        return
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    AVIATION_KEY = os.getenv("AVIATIONSTACK_API_KEY", "").strip()
+    TEAMS_WEBHOOK = os.getenv("TEAMS_WEBHOOK")
+
+    REPLAY_MODE = os.getenv("AVIATIONSTACK_REPLAY_MODE", "live").strip().lower()
+    REPLAY_DIR = os.getenv("AVIATIONSTACK_REPLAY_DIR", "recordings")
+    REPLAY_SPEED = float(os.getenv("AVIATIONSTACK_REPLAY_SPEED", "1"))
+
+    FLEET_RECONCILE_SECONDS = int(os.getenv("FLEET_RECONCILE_SECONDS", "300"))
+
+    WEB_CONCURRENCY = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+
+    # deployment-wide rates → this worker's share
+    CLIENT_RATE_PER_MIN = float(os.getenv("FLIGHT_CLIENT_RATE_PER_MIN", "60")) / WEB_CONCURRENCY
+    CLIENT_RATE_BURST = max(int(os.getenv("FLIGHT_CLIENT_RATE_BURST", "20")) // WEB_CONCURRENCY, 1)
+    CALLSIGN_RATE_PER_MIN = float(os.getenv("FLIGHT_CALLSIGN_RATE_PER_MIN", "20")) / WEB_CONCURRENCY
+    CALLSIGN_RATE_BURST = max(int(os.getenv("FLIGHT_CALLSIGN_RATE_BURST", "5")) // WEB_CONCURRENCY, 1)
+    UPSTREAM_MAX_IN_FLIGHT = int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", "4"))
+
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+    ANALYTICS_HALF_LIFE_DAYS = float(os.getenv("ANALYTICS_HALF_LIFE_DAYS", "30"))
+    ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+
+    DATABASE_URL = os.getenv("DATABASE_URL")
+
+    _SETTINGS_LOADED = True
 
 def get_connection():
     if DATABASE_URL:
-        # Production → PostgreSQL
+        # Production → PostgreSQL (driver only imported when used)
+        import psycopg2
+
         url = urlparse(DATABASE_URL)
         return psycopg2.connect(
             host=url.hostname,
@@ -50,12 +122,82 @@ def get_connection():
 # -------------------------------------------------
 # APP
 # -------------------------------------------------
-APP = Flask(__name__, static_folder="static", template_folder="templates")
-CORS(APP)
+BP = Blueprint("skybridge", __name__)
 
 DB_FILE = "skybridge_db"
 AVIATIONSTACK_ENDPOINT = "http://api.aviationstack.com/v1/flights"
 
+# trips table column order (SELECT *)
+TRIP_COLUMNS = (
+    "id",
+    "coordinator_name",
+    "employee_code",
+    "leader_name",
+    "travel_date",
+    "flight_number",
+    "callsign",
+    "from_airport",
+    "from_terminal",
+    "dep_time",
+    "to_airport",
+    "to_terminal",
+    "arr_time",
+    "status"
+)
+
+ALERT_COLUMNS = ("id", "flight_no", "type", "message", "created_at", "seen")
+
+# set by init_backend()
+UPSTREAM = None
+CLIENT_LIMITER = None
+CALLSIGN_LIMITER = None
+UPSTREAM_GATE = None
+
+# set on first /api/analytics/delays call
+ANALYTICS = None
+
+# shed / served tallies, per worker
+ADMISSION = Counters()
+
+def patch_pkgutil():
+    # --- Python 3.14 Fix for Flask ---
+    import pkgutil, importlib
+    if not hasattr(pkgutil, "get_loader"):
+        def get_loader(name):
+            try:
+                return importlib.util.find_spec(name)
+            except:
+                return None
+        pkgutil.get_loader = get_loader
+
+def create_app():
+    patch_pkgutil()
+    load_settings()
+
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    CORS(app)
+
+    # behind the platform proxy remote_addr is the proxy; take the client
+    # from X-Forwarded-For, trusting only TRUSTED_PROXY_HOPS entries
+    if TRUSTED_PROXY_HOPS > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
+    app.register_blueprint(BP)
+    app.before_request(init_backend)
+    app.cli.command("migrate")(migrate_command)
+
+    return app
+
+def __getattr__(name):
+    # keeps `gunicorn app:APP` working without building the app at import
+    global APP
+
+    if name == "APP":
+        APP = create_app()
+        return APP
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # -------------------------------------------------
 # DATABASE
 # -------------------------------------------------
@@ -96,17 +238,222 @@ def init_db():
     )
     """)
 
+    # One row per landed flight, feeds /api/analytics/delays
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS delay_observations (
+        id SERIAL PRIMARY KEY,
+        flight_no TEXT,
+        flight_date TEXT,
+        airline TEXT,
+        dep_airport TEXT,
+        arr_airport TEXT,
+        dep_hour INTEGER,
+        dep_delay INTEGER,
+        arr_delay INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (flight_no, flight_date)
+    )
+    """)
+
     conn.commit()
     conn.close()
 
-init_db()
+def migrate_command():
+    """Create the trips, alerts and delay_observations tables (safe to re-run)."""
+    load_settings()
+    init_db()
+    print("Database migrated")
+
+# -------------------------------------------------
+# ACTIVE FLEET INDEX
+# -------------------------------------------------
+
+FLEET = FleetIndex()
+
+def load_active_trips():
+    conn = get_connection()
+    c = conn.cursor()
+
+    c.execute(WARM_SQL)
+    rows = c.fetchall()
+
+    conn.close()
+    return rows
+
+def warm_fleet_index():
+    FLEET.warm(load_active_trips())
+    print("Fleet index warmed:", len(FLEET), "active trips")
+
+def reconcile_fleet_index():
+    drift = FLEET.reconcile(load_active_trips())
+    if drift:
+        print("Fleet index reconciled:", drift, "trips drifted")
+
+def start_fleet_reconciler():
+    if FLEET_RECONCILE_SECONDS <= 0:
+        return
+
+    def loop():
+        while True:
+            time.sleep(FLEET_RECONCILE_SECONDS)
+            try:
+                reconcile_fleet_index()
+            except Exception as e:
+                print("Fleet reconcile error:", e)
+
+    threading.Thread(target=loop, name="fleet-reconciler", daemon=True).start()
+
+def lookup_active_trip(c, callsign):
+    # the index may lag other workers: trust it only while its newest
+    # trip for this callsign is still the newest active one in the DB
+    c.execute("""
+        SELECT MAX(id) FROM trips
+        WHERE callsign = %s AND status != 'ENDED'
+    """, (callsign,))
+
+    row = c.fetchone()
+    latest_id = row[0] if row else None
+
+    record = FLEET.latest(callsign)
+    if record is not None and record.id == latest_id:
+        return record
+
+    # added / ended / superseded elsewhere → reload this callsign
+    reload_fleet_callsign(c, callsign)
+    return FLEET.latest(callsign)
+
+def reload_fleet_callsign(c, callsign):
+    c.execute(WARM_SQL + " AND callsign = %s", (callsign,))
+    FLEET.replace_callsign(callsign, c.fetchall())
+
+def refresh_fleet_callsign(callsign):
+    # re-read every active trip for one callsign after the index went stale
+    conn = get_connection()
+    c = conn.cursor()
+
+    reload_fleet_callsign(c, callsign)
+
+    conn.close()
+
+# -------------------------------------------------
+# DELAY ANALYTICS
+# -------------------------------------------------
+
+_ANALYTICS_REFRESH_LOCK = threading.Lock()
+
+def refresh_analytics():
+    # tail delay_observations past the last ingested id, in chunks.
+    # Only called from the analytics endpoint, never on backend init.
+    global ANALYTICS
+
+    # the first (warming) call waits; later ones skip if a refresh is
+    # already running, it will pick up the same rows
+    warming = ANALYTICS is None or not ANALYTICS.refreshed_at
+    if not _ANALYTICS_REFRESH_LOCK.acquire(blocking=warming):
+        return
+
+    try:
+        if ANALYTICS is None:
+            # numpy only loads once analytics is actually used
+            from analytics import DelayAnalytics
+            ANALYTICS = DelayAnalytics(ANALYTICS_HALF_LIFE_DAYS)
+
+        if ANALYTICS.refreshed_at and time.time() - ANALYTICS.refreshed_at <= ANALYTICS_REFRESH_SECONDS:
+            return
+
+        from analytics import TAIL_SQL
+
+        conn = get_connection()
+        try:
+            c = conn.cursor()
+            c.execute(TAIL_SQL, (ANALYTICS.last_id,))
+
+            ingested = ANALYTICS.ingest([])
+            while True:
+                rows = c.fetchmany(50000)
+                if not rows:
+                    break
+                ingested += ANALYTICS.ingest(rows)
+        finally:
+            conn.close()
+
+        if ingested:
+            print("Analytics ingested:", ingested, "observations")
+    finally:
+        _ANALYTICS_REFRESH_LOCK.release()
+
+def record_delay_observation(callsign, flight_obj):
+    # own connection, after the status sync committed: analytics must
+    # never roll back or fail /api/flight
+    try:
+        from analytics import observation_from_flight
+
+        obs = observation_from_flight(callsign, flight_obj)
+        if not obs:
+            return
+
+        conn = get_connection()
+        try:
+            c = conn.cursor()
+            c.execute("""
+                INSERT INTO delay_observations (
+                    flight_no, flight_date, airline,
+                    dep_airport, arr_airport, dep_hour,
+                    dep_delay, arr_delay
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (flight_no, flight_date) DO NOTHING
+            """, obs)
+            conn.commit()
+        finally:
+            conn.close()
+
+    except Exception as e:
+        print("Delay observation error:", e)
+
+# -------------------------------------------------
+# BACKEND (first request)
+# -------------------------------------------------
+
+_BACKEND_LOCK = threading.Lock()
+_BACKEND_READY = False
+
+def init_backend():
+    global UPSTREAM, CLIENT_LIMITER, CALLSIGN_LIMITER, UPSTREAM_GATE
+    global _BACKEND_READY
+
+    if _BACKEND_READY:
+        return
+
+    with _BACKEND_LOCK:
+        if _BACKEND_READY:
+            return
+
+        load_settings()
+
+        # a sync worker handles one request at a time → the cap never sheds
+        if not request.environ.get("wsgi.multithread") and UPSTREAM_MAX_IN_FLIGHT > 1:
+            print("WARNING: single-threaded worker, UPSTREAM_MAX_IN_FLIGHT has no effect;"
+                  " run gunicorn with gunicorn.conf.py (gthread)")
+
+        UPSTREAM = replay.build_client(REPLAY_MODE, REPLAY_DIR, REPLAY_SPEED)
+
+        CLIENT_LIMITER = RateLimiter(CLIENT_RATE_PER_MIN, CLIENT_RATE_BURST)
+        CALLSIGN_LIMITER = RateLimiter(CALLSIGN_RATE_PER_MIN, CALLSIGN_RATE_BURST)
+        UPSTREAM_GATE = UpstreamGate(UPSTREAM_MAX_IN_FLIGHT)
+
+        warm_fleet_index()
+        start_fleet_reconciler()
+
+        _BACKEND_READY = True
 
 # -------------------------------------------------
 # HELPERS
 # -------------------------------------------------
 
 def fetch_flight_data(callsign, travel_date):
-    if not AVIATION_KEY:
+    # replay serves recorded responses, no key needed
+    if not AVIATION_KEY and UPSTREAM.mode != "replay":
         return None
 
     params = {
@@ -117,14 +464,12 @@ def fetch_flight_data(callsign, travel_date):
     }
 
     try:
-        r = requests.get(
+        payload = UPSTREAM.get(
             AVIATIONSTACK_ENDPOINT,
-            params=params,
-            timeout=12,
-            verify=False
+            params,
+            timeout=12
         )
-        r.raise_for_status()
-        data = r.json().get("data", [])
+        data = payload.get("data", [])
 
         print("API RESPONSE:", data)
  #       print("DEBUG → AviationStack records:", len(data)) 
@@ -203,6 +548,12 @@ def send_teams_alert(message):
     if not TEAMS_WEBHOOK:
         return
 
+    # replayed flights are simulated: never post them to the real channel
+    # (nor wait on the webhook timeout, it would skew replay timings)
+    if UPSTREAM is not None and UPSTREAM.mode == "replay":
+        print("Replay mode, Teams alert not sent:", message)
+        return
+
     try:
         # detect delay
         has_delay = "Delay" in message
@@ -273,7 +624,7 @@ def send_teams_alert(message):
             ]
         }
 
-        res = requests.post(
+        res = replay.http().post(
             TEAMS_WEBHOOK,
             json=card_payload,
             timeout=5,
@@ -292,12 +643,12 @@ def send_teams_alert(message):
 # ROUTES
 # -------------------------------------------------
 
-@APP.route("/")
+@BP.route("/")
 def index():
     return render_template("index.html")
 
 # -------------------- ADD TRIP --------------------
-@APP.route("/api/add-trip", methods=["POST"])
+@BP.route("/api/add-trip", methods=["POST"])
 def add_trip():
     data = request.json
     callsign = data["flight_number"].strip().upper()
@@ -318,7 +669,7 @@ def add_trip():
             to_airport, to_terminal, arr_time, status
         )
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-
+        RETURNING id
     """, (
         data["coordinator_name"],
         data["employee_code"],
@@ -335,12 +686,27 @@ def add_trip():
         "UNKNOWN"
     ))
 
+    trip_id = c.fetchone()[0]
+
     conn.commit()
     conn.close()
+
+    FLEET.upsert((
+        trip_id,
+        callsign,
+        data["travel_date"],
+        "UNKNOWN",
+        data["dep_time"],
+        data["arr_time"],
+        data["from_terminal"],
+        data["to_terminal"],
+        data["leader_name"]
+    ))
+
     return jsonify({"status": "ok"})
 
 # -------------------- LOAD TRIPS (UI) --------------------
-@APP.route("/api/trips")
+@BP.route("/api/trips")
 def get_trips():
     conn = get_connection()
 
@@ -354,29 +720,13 @@ def get_trips():
     rows = c.fetchall()
     conn.close()
 
-    trips = []
-    for r in rows:
-        trips.append({
-            "id": r[0],
-            "coordinator_name": r[1],
-            "employee_code": r[2],
-            "leader_name": r[3],
-            "travel_date": r[4],
-            "flight_number": r[5],
-            "callsign": r[6],
-            "from_airport": r[7],
-            "from_terminal": r[8],
-            "dep_time": r[9],
-            "to_airport": r[10],
-            "to_terminal": r[11],
-            "arr_time": r[12],
-            "status": r[13]
-        })
+    # ?shape=columnar → keys once, one value array per column
+    trips = shape_rows(TRIP_COLUMNS, rows, request.args.get("shape"))
 
-    return jsonify(trips)
+    return json_response(trips)
 
 # -------------------- LOAD ALL TRIPS (DATABASE VIEW) --------------------
-@APP.route("/api/trips-all")
+@BP.route("/api/trips-all")
 def get_all_trips():
     conn = get_connection()
 
@@ -386,30 +736,14 @@ def get_all_trips():
     rows = c.fetchall()
     conn.close()
 
-    trips = []
-    for r in rows:
-        trips.append({
-            "id": r[0],
-            "coordinator_name": r[1],
-            "employee_code": r[2],
-            "leader_name": r[3],
-            "travel_date": r[4],
-            "flight_number": r[5],
-            "callsign": r[6],
-            "from_airport": r[7],
-            "from_terminal": r[8],
-            "dep_time": r[9],
-            "to_airport": r[10],
-            "to_terminal": r[11],
-            "arr_time": r[12],
-            "status": r[13]
-        })
+    # ?shape=columnar → keys once, one value array per column
+    trips = shape_rows(TRIP_COLUMNS, rows, request.args.get("shape"))
 
-    return jsonify(trips)
+    return json_response(trips)
 
 
 # -------------------- END TRIP (REPLACES DELETE) --------------------
-@APP.route("/api/end-trip/<int:trip_id>", methods=["POST"])
+@BP.route("/api/end-trip/<int:trip_id>", methods=["POST"])
 def end_trip(trip_id):
     conn = get_connection()
 
@@ -423,10 +757,13 @@ def end_trip(trip_id):
 
     conn.commit()
     conn.close()
+
+    FLEET.remove(trip_id)
+
     return jsonify({"status": "ended"})
 
 # -------------------- UPDATE TRIP (EDIT) --------------------
-@APP.route("/api/update-trip/<int:trip_id>", methods=["POST"])
+@BP.route("/api/update-trip/<int:trip_id>", methods=["POST"])
 def update_trip(trip_id):
 
     data = request.json
@@ -470,28 +807,85 @@ def update_trip(trip_id):
     conn.commit()
     conn.close()
 
+    # status untouched, so ENDED trips stay out of the index
+    FLEET.update(
+        trip_id,
+        leader_name=data["leader_name"],
+        travel_date=data["travel_date"],
+        callsign=data["flight_number"].strip().upper(),
+        from_terminal=data["from_terminal"],
+        dep_time=data["dep_time"],
+        to_terminal=data["to_terminal"],
+        arr_time=data["arr_time"]
+    )
+
     return jsonify({"status": "updated"})
 
 
 # -------------------- LIVE FLIGHT & STATUS SYNC --------------------
-@APP.route("/api/flight/<callsign>")
+@BP.route("/api/flight/<callsign>")
 def get_flight(callsign):
 
+    # per client first, so one noisy tab cannot drain a callsign's budget
+    allowed, retry_after = CLIENT_LIMITER.take(request.remote_addr)
+    if not allowed:
+        return rate_limited("client", retry_after)
+
+    allowed, retry_after = CALLSIGN_LIMITER.take(callsign.strip().upper())
+    if not allowed:
+        return rate_limited("callsign", retry_after)
+
+    # never queue behind slow upstream calls → serve last known status
+    if not UPSTREAM_GATE.try_enter():
+        ADMISSION.incr("shed_upstream_busy")
+        return last_known_flight(callsign)
+
+    try:
+        ADMISSION.incr("synced")
+        return sync_flight(callsign)
+    finally:
+        UPSTREAM_GATE.leave()
+
+def rate_limited(scope, retry_after):
+    ADMISSION.incr(f"shed_{scope}_rate")
+
+    resp = jsonify({"error": "Too many requests", "scope": scope})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+def last_known_flight(callsign):
     conn = get_connection()
     c = conn.cursor()
 
-    # get travel date for this trip
-    c.execute("""
-        SELECT travel_date
-        FROM trips
-        WHERE callsign = %s
-        AND status != 'ENDED'
-        ORDER BY id DESC
-        LIMIT 1
-    """, (callsign,))
+    trip = lookup_active_trip(c, callsign)
 
-    row = c.fetchone()
-    travel_date = row[0] if row else None
+    conn.close()
+
+    if not trip:
+        return jsonify({"flight": None, "stale": True})
+
+    return jsonify({
+        "flight": {
+            "callsign": callsign,
+            "status": trip.status,
+            "live": None,
+            "dep_time": trip.dep_time,
+            "arr_time": trip.arr_time,
+            "dep_terminal": trip.from_terminal,
+            "arr_terminal": trip.to_terminal,
+            "stale": True
+        }
+    })
+
+def sync_flight(callsign):
+
+    conn = get_connection()
+    c = conn.cursor()
+
+    # get travel date for this trip
+    trip = lookup_active_trip(c, callsign)
+    travel_date = trip.travel_date if trip else None
 
     print("DEBUG → Flight:", callsign, "Date:", travel_date)
 
@@ -563,26 +957,23 @@ def get_flight(callsign):
         "LIVE": 3,
         "LANDED": 4
     }
-    # get current DB status
+    # only trips ranked at or below the new status may be overwritten.
+    # The guard is in SQL: this worker's index can lag another worker
+    # that already stored a higher status.
+    overwritable = [name for name, rank in priority.items() if rank <= priority.get(derived_status, 0)]
+    expected = sum(1 for t in FLEET.active(callsign) if t.status in overwritable)
+
     c.execute("""
-    SELECT status
-    FROM trips
+    UPDATE trips
+    SET status = %s
     WHERE callsign = %s AND status != 'ENDED'
-    ORDER BY id DESC
-    LIMIT 1
-    """, (callsign,))
-
-    row = c.fetchone()
-    current_status = row[0] if row else "UNKNOWN"
+    AND status IN (""" + ", ".join(["%s"] * len(overwritable)) + """)
+    """, (derived_status, callsign, *overwritable))
 
-    # update only if new status is higher priority
-    if priority.get(derived_status,0) >= priority.get(current_status,0):
+    status_updated = c.rowcount > 0
 
-        c.execute("""
-        UPDATE trips
-        SET status = %s
-        WHERE callsign = %s AND status != 'ENDED'
-        """, (derived_status, callsign))
+    # DB disagrees with the index → reload this callsign after commit
+    stale_index = c.rowcount != expected
 
     # ---------------------------------------
     # Extract scheduled times from API
@@ -627,21 +1018,15 @@ def get_flight(callsign):
     # UPDATE DB TIMES IF DIFFERENT
     # ---------------------------------------
 
-    if dep_time or arr_time or dep_terminal or arr_terminal:
-
-        c.execute("""
-            SELECT dep_time, arr_time, from_terminal, to_terminal, id, leader_name
-            FROM trips
-            WHERE callsign = %s
-            AND status != 'ENDED'
-            ORDER BY id DESC
-            LIMIT 1
-        """, (callsign,))
+    time_update = None
+    alert_message = None
 
-        row = c.fetchone()
+    if dep_time or arr_time or dep_terminal or arr_terminal:
 
-        if row:
-            db_dep, db_arr, db_dep_term, db_arr_term, trip_id, leader_name = row
+        if trip:
+            db_dep, db_arr = trip.dep_time, trip.arr_time
+            db_dep_term, db_arr_term = trip.from_terminal, trip.to_terminal
+            trip_id, leader_name = trip.id, trip.leader_name
 
             new_dep = dep_time if dep_time else db_dep
             new_arr = arr_time if arr_time else db_arr
@@ -677,18 +1062,10 @@ def get_flight(callsign):
                 if delay and delay > 0:
                     changes.append(f"Delay: {delay} min")
 
-                # ✅ FINAL ALERT (ONLY ONE)
-                if changes:
-                    message = f"{callsign} | Leader: {leader_name} | " + " | ".join(changes)
-
-                    create_alert(
-                        callsign,
-                        "flight_update",
-                        message
-                    )
-
                 # ---------------- UPDATE DB ----------------
 
+                # only if the indexed trip is still the latest active one
+                # (another worker may have ended or superseded it)
                 c.execute("""
                     UPDATE trips
                     SET dep_time = %s,
@@ -696,27 +1073,58 @@ def get_flight(callsign):
                         from_terminal = %s,
                         to_terminal = %s
                     WHERE id = %s
-                """, (new_dep, new_arr, new_dep_term, new_arr_term, trip_id))
+                    AND id = (
+                        SELECT MAX(id) FROM trips
+                        WHERE callsign = %s AND status != 'ENDED'
+                    )
+                """, (new_dep, new_arr, new_dep_term, new_arr_term, trip_id, callsign))
+
+                if c.rowcount == 1:
+                    time_update = dict(
+                        dep_time=new_dep,
+                        arr_time=new_arr,
+                        from_terminal=new_dep_term,
+                        to_terminal=new_arr_term
+                    )
+
+                    # ✅ FINAL ALERT (ONLY ONE)
+                    if changes:
+                        alert_message = f"{callsign} | Leader: {leader_name} | " + " | ".join(changes)
+                else:
+                    stale_index = True
+
+    conn.commit()
+    conn.close()
 
-    
     # ---------------------------------------
-    # GET FINAL STABILIZED STATUS FROM DB
+    # INDEX + ALERT ONLY AFTER A SUCCESSFUL COMMIT
     # ---------------------------------------
 
-    c.execute("""
-    SELECT status
-    FROM trips
-    WHERE callsign = %s
-    AND status != 'ENDED'
-    ORDER BY id DESC
-    LIMIT 1
-    """, (callsign,))
+    if stale_index:
+        refresh_fleet_callsign(callsign)
+    else:
+        if status_updated:
+            FLEET.set_status(callsign, derived_status, among=overwritable)
+        if time_update:
+            FLEET.update(trip.id, **time_update)
+
+    if alert_message:
+        create_alert(
+            callsign,
+            "flight_update",
+            alert_message
+        )
 
-    row = c.fetchone()
-    final_status = row[0] if row else derived_status            
+    # 📊 landed → final delays are known, keep them for analytics
+    if derived_status == "LANDED":
+        record_delay_observation(callsign, flight_obj)
 
-    conn.commit()
-    conn.close()
+    # ---------------------------------------
+    # GET FINAL STABILIZED STATUS FROM INDEX
+    # ---------------------------------------
+
+    latest = FLEET.latest(callsign)
+    final_status = latest.status if latest else derived_status
 
     return jsonify({
         "flight": {
@@ -726,12 +1134,13 @@ def get_flight(callsign):
             "dep_time": dep_time,
             "arr_time": arr_time,
             "dep_terminal": dep_terminal,
-            "arr_terminal": arr_terminal
+            "arr_terminal": arr_terminal,
+            "stale": False
         }
     })
 
 # -------------------- ALERTS API (HOMEPAGE) --------------------
-@APP.route("/api/alerts")
+@BP.route("/api/alerts")
 def get_alerts():
 
     conn = get_connection()
@@ -746,25 +1155,87 @@ def get_alerts():
 
     rows = c.fetchall()
 
-    alerts = []
+    conn.close()
+
+    rows = [(r[0], r[1], r[2], r[3], str(r[4]), r[5]) for r in rows]
+    alerts = shape_rows(ALERT_COLUMNS, rows, request.args.get("shape"))
 
-    for r in rows:
-        alerts.append({
-            "id": r[0],
-            "flight_no": r[1],
-            "type": r[2],
-            "message": r[3],
-            "created_at": str(r[4]),
-            "seen": r[5]
-        })
+    return json_response({"alerts": alerts})
+
+# -------------------- DELAY ANALYTICS --------------------
+@BP.route("/api/analytics/delays")
+def get_delay_analytics():
+    from analytics import DIMENSIONS, METRICS, route_key, shift_hhmm
 
+    metric = request.args.get("metric", "arr_delay")
+    if metric not in METRICS:
+        return jsonify({"error": "Unknown metric"}), 400
 
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+
+    # warm / refresh here only; a failure is this endpoint's problem
+    try:
+        refresh_analytics()
+    except Exception as e:
+        print("Analytics refresh error:", e)
+        return jsonify({"error": "Analytics unavailable"}), 503
+
+    # upcoming trips → predicted arrival slippage
+    conn = get_connection()
+    c = conn.cursor()
+
+    c.execute("""
+        SELECT id, callsign, travel_date, from_airport, to_airport, dep_time, arr_time
+        FROM trips
+        WHERE status IN ('UNKNOWN', 'SCHEDULED')
+        AND travel_date >= %s
+        ORDER BY travel_date, dep_time
+        LIMIT %s
+    """, (time.strftime("%Y-%m-%d"), limit))
+
+    rows = c.fetchall()
     conn.close()
 
-    return jsonify({"alerts": alerts})
+    upcoming = []
+    for trip_id, callsign, travel_date, from_airport, to_airport, dep_time, arr_time in rows:
+        hour = int(dep_time[:2]) if dep_time and dep_time[:2].isdigit() else None
+
+        prediction = ANALYTICS.predict(
+            route_key(from_airport, to_airport),
+            (callsign or "")[:2] or None,
+            hour
+        )
+
+        upcoming.append({
+            "trip_id": trip_id,
+            "callsign": callsign,
+            "travel_date": travel_date,
+            "arr_time": arr_time,
+            "prediction": prediction,
+            "predicted_arr_time": (
+                shift_hhmm(arr_time, prediction["p50"]) if prediction else None
+            )
+        })
+
+    return json_response({
+        "metric": metric,
+        "observations": ANALYTICS.observations,
+        "as_of": str(ANALYTICS.as_of),
+        **{dim: ANALYTICS.groups(dim, metric, limit) for dim in DIMENSIONS},
+        "upcoming": upcoming
+    })
+
+# -------------------- ADMISSION COUNTERS --------------------
+@BP.route("/api/admission")
+def get_admission():
+    return jsonify({
+        "counters": ADMISSION.snapshot(),
+        "upstream_in_flight": UPSTREAM_GATE.in_flight,
+        "upstream_limit": UPSTREAM_GATE.limit
+    })
 
 # -------------------- MARK ALERTS SEEN (HOMEPAGE) --------------------
-@APP.route("/api/alerts/mark-seen", methods=["POST"])
+@BP.route("/api/alerts/mark-seen", methods=["POST"])
 def mark_alerts_seen():
 
     conn = get_connection()
@@ -789,5 +1260,10 @@ def mark_alerts_seen():
 # START
 # -------------------------------------------------
 if __name__ == "__main__":
+    APP = create_app()
+
+    # local dev: make sure the tables exist
+    init_db()
+
     port = int(os.environ.get("PORT", 5000))
     APP.run(host="0.0.0.0", port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,75 @@
+# SKYBRIDGE — active fleet index memory / lookup benchmark
+#
+# Warms a FleetIndex with N synthetic active trips (distinct leader
+# names) and checks traced memory against MEMORY_BUDGET_BYTES,
+# scaled to N. Exits non-zero when over budget.
+#
+#   python benchmarks/bench_fleet_index.py [trips]
+
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fleet_index import FleetIndex, MEMORY_BUDGET_BYTES
+
+
+def make_rows(n):
+    rnd = random.Random(42)
+    statuses = ["UNKNOWN", "SCHEDULED", "ACTIVE", "LIVE", "LANDED"]
+
+    rows = []
+    for i in range(1, n + 1):
+        # fresh str objects per row, like a DB driver returns them
+        rows.append((
+            i,
+            "".join(["AI", str(rnd.randint(100, 9999))]),
+            "".join(["2026-10-", f"{rnd.randint(1, 28):02d}"]),
+            "".join([rnd.choice(statuses)]),
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}",
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}",
+            "".join(["T", str(rnd.randint(1, 3))]),
+            "".join(["T", str(rnd.randint(1, 3))]),
+            f"Leader Name {i}"
+        ))
+    return rows
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # rows are built under tracing and dropped after the warm, so the
+    # figure is what the index itself keeps alive (strings included)
+    tracemalloc.start()
+    rows = make_rows(n)
+    callsigns = [r[1] for r in rows[:1000]]
+
+    fleet = FleetIndex()
+    fleet.warm(rows)
+    del rows
+
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    budget = MEMORY_BUDGET_BYTES * n / 100000
+
+    start = time.perf_counter()
+    for _ in range(100):
+        for callsign in callsigns:
+            fleet.latest(callsign)
+    lookup_ns = (time.perf_counter() - start) / (100 * len(callsigns)) * 1e9
+
+    print(f"{n} active trips")
+    print(f"traced memory   {used / 1e6:8.2f} MB  ({used / n:.0f} bytes/trip)")
+    print(f"budget          {budget / 1e6:8.2f} MB")
+    print(f"latest() lookup {lookup_ns:8.0f} ns")
+
+    if used > budget:
+        print("OVER BUDGET")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
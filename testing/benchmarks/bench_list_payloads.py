@@ -0,0 +1,95 @@
+# SKYBRIDGE — /api/trips payload benchmark
+#
+# Bytes on the wire and server CPU per 10k trips:
+# today's jsonify path vs. the fast path (records / columnar, gzip / br).
+#
+#   python benchmarks/bench_list_payloads.py [trips] [repeats]
+
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import serialization
+from serialization import dumps, as_records, as_columnar, compress
+
+TRIP_COLUMNS = (
+    "id", "coordinator_name", "employee_code", "leader_name", "travel_date",
+    "flight_number", "callsign", "from_airport", "from_terminal", "dep_time",
+    "to_airport", "to_terminal", "arr_time", "status"
+)
+
+
+def make_rows(n):
+    rnd = random.Random(42)
+    airports = ["BLR", "DEL", "BOM", "HYD", "MAA", "DXB", "LHR", "SIN"]
+    statuses = ["UNKNOWN", "SCHEDULED", "ACTIVE", "LIVE", "LANDED", "ENDED"]
+
+    rows = []
+    for i in range(n, 0, -1):
+        flight = f"AI{rnd.randint(100, 9999)}"
+        rows.append((
+            i,
+            f"Coordinator {rnd.randint(1, 50)}",
+            f"EMP{rnd.randint(10000, 99999)}",
+            f"Leader {rnd.randint(1, 5000)}",
+            f"2026-10-{rnd.randint(1, 28):02d}",
+            flight,
+            flight,
+            rnd.choice(airports),
+            f"T{rnd.randint(1, 3)}",
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}",
+            rnd.choice(airports),
+            f"T{rnd.randint(1, 3)}",
+            f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}",
+            rnd.choice(statuses)
+        ))
+    return rows
+
+
+def baseline(rows):
+    # per-row dict + Flask's default provider (sorted keys, ASCII, compact)
+    trips = []
+    for r in rows:
+        trips.append({name: r[i] for i, name in enumerate(TRIP_COLUMNS)})
+    return json.dumps(trips, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def cpu(fn, repeats):
+    start = time.process_time()
+    for _ in range(repeats):
+        out = fn()
+    return (time.process_time() - start) / repeats, out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = make_rows(n)
+
+    print("json backend:", "orjson" if serialization.orjson else "stdlib")
+    print("encodings:", ", ".join(serialization.ENCODINGS))
+    print(f"{n} trips, {repeats} repeats\n")
+
+    cases = [
+        ("jsonify (today)", lambda: baseline(rows)),
+        ("fast records", lambda: dumps(as_records(TRIP_COLUMNS, rows))),
+        ("fast columnar", lambda: dumps(as_columnar(TRIP_COLUMNS, rows)))
+    ]
+
+    print(f"{'case':<20}{'encoding':<10}{'bytes':>12}{'cpu ms':>10}")
+
+    for name, fn in cases:
+        ms, body = cpu(fn, repeats)
+        print(f"{name:<20}{'identity':<10}{len(body):>12}{ms * 1000:>10.2f}")
+
+        for enc in serialization.ENCODINGS:
+            zms, packed = cpu(lambda: compress(body, enc), repeats)
+            print(f"{'':<20}{enc:<10}{len(packed):>12}{(ms + zms) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
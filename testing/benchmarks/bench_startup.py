@@ -0,0 +1,86 @@
+# SKYBRIDGE — startup benchmark
+#
+# Cold `import app`, create_app(), and the first / second request
+# against a throwaway SQLite DB, each in a fresh interpreter.
+#
+#   python benchmarks/bench_startup.py [runs]
+
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import statistics
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+client = flask_app.test_client()
+first = client.get("/api/alerts")
+t3 = time.perf_counter()
+second = client.get("/api/alerts")
+t4 = time.perf_counter()
+print(json.dumps({
+    "status": [first.status_code, second.status_code],
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "second_request_ms": (t4 - t3) * 1000,
+    "psycopg2_loaded": "psycopg2" in sys.modules,
+    "requests_loaded": "requests" in sys.modules
+}))
+"""
+
+
+def run(code, cwd, env):
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    lines = out.stdout.strip().splitlines()
+    return lines[-1] if lines else ""
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env["PYTHONPATH"] = APP_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    env["FLEET_RECONCILE_SECONDS"] = "0"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # one-shot migration, like a deploy would run it
+        run("import app; app.load_settings(); app.init_db()", tmp, env)
+
+        samples = [json.loads(run(PROBE, tmp, env)) for _ in range(runs)]
+
+    # timing an error page says nothing about startup
+    failed = [s["status"] for s in samples if s["status"] != [200, 200]]
+    if failed:
+        print("Startup probe failed, status codes:", failed)
+        sys.exit(1)
+
+    print(f"{runs} cold starts (SQLite)\n")
+    for key in ("import_ms", "create_app_ms", "first_request_ms", "second_request_ms"):
+        values = [s[key] for s in samples]
+        print(f"{key:<20}median {statistics.median(values):8.2f}   max {max(values):8.2f}")
+
+    print()
+    print("psycopg2 imported:", any(s["psycopg2_loaded"] for s in samples))
+    print("requests imported:", any(s["requests_loaded"] for s in samples))
+
+
+if __name__ == "__main__":
+    main()
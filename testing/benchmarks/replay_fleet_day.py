@@ -0,0 +1,157 @@
+# SKYBRIDGE — recorded fleet day, replayed
+#
+# Seeds one active trip per recorded flight (up to --flights), then
+# polls /api/flight for all of them every --interval recorded seconds
+# while the replay clock runs a whole day at --speed. Exercises the
+# status sync, alerting and list endpoints without network or quota.
+#
+# Needs a throwaway PostgreSQL DB in DATABASE_URL and a directory of
+# AVIATIONSTACK_REPLAY_MODE=record files. Trips it adds are ended at
+# the end; Teams alerts are never posted in replay mode.
+#
+#   python benchmarks/replay_fleet_day.py --dir recordings --flights 1000 --speed 1440
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay a recorded fleet day")
+    parser.add_argument("--dir", default="recordings", help="recorded .jsonl.gz files")
+    parser.add_argument("--flights", type=int, default=1000, help="max flights to seed")
+    parser.add_argument("--speed", type=float, default=1440, help="replay speed (1440 = a day per minute)")
+    parser.add_argument("--interval", type=int, default=600, help="recorded seconds between polls of a flight")
+    parser.add_argument("--threads", type=int, default=8, help="concurrent /api/flight requests")
+    parser.add_argument("--date", default=date.today().isoformat(), help="travel date to shift onto")
+    return parser.parse_args()
+
+
+def count_alerts(app):
+    conn = app.get_connection()
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM alerts")
+    n = c.fetchone()[0]
+    conn.close()
+    return n
+
+
+def seed_trips(app, client, callsigns, travel_date):
+    for i, callsign in enumerate(callsigns):
+        r = client.post("/api/add-trip", json={
+            "coordinator_name": "replay",
+            "employee_code": f"R{i:05d}",
+            "leader_name": f"Replay Leader {i}",
+            "travel_date": travel_date,
+            "flight_number": callsign,
+            "from_airport": "",
+            "from_terminal": "",
+            "dep_time": "",
+            "to_airport": "",
+            "to_terminal": "",
+            "arr_time": ""
+        })
+        if r.status_code != 200:
+            print("Seed failed for", callsign, r.status_code)
+
+    conn = app.get_connection()
+    c = conn.cursor()
+    c.execute(
+        "SELECT id FROM trips WHERE coordinator_name = 'replay' AND status != 'ENDED'"
+    )
+    ids = [row[0] for row in c.fetchall()]
+    conn.close()
+    return ids
+
+
+def main():
+    args = parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        print("Set DATABASE_URL to a throwaway PostgreSQL database")
+        sys.exit(1)
+
+    # before load_settings: replay upstream, no admission control in the way
+    os.environ["AVIATIONSTACK_REPLAY_MODE"] = "replay"
+    os.environ["AVIATIONSTACK_REPLAY_DIR"] = args.dir
+    os.environ["AVIATIONSTACK_REPLAY_SPEED"] = str(args.speed)
+    os.environ["FLIGHT_CLIENT_RATE_PER_MIN"] = "0"
+    os.environ["FLIGHT_CALLSIGN_RATE_PER_MIN"] = "0"
+    os.environ["UPSTREAM_MAX_IN_FLIGHT"] = str(args.threads)
+
+    import app
+
+    flask_app = app.create_app()
+    app.init_db()
+    client = flask_app.test_client()
+
+    # first request loads the recordings (and starts the replay clock)
+    client.get("/api/alerts")
+    callsigns = app.UPSTREAM.flights()[:args.flights]
+    if not callsigns:
+        print("No recorded flights in", args.dir)
+        sys.exit(1)
+
+    trip_ids = seed_trips(app, client, callsigns, args.date)
+    alerts_before = count_alerts(app)
+
+    rounds = DAY_SECONDS // args.interval
+    tick = args.interval / args.speed
+
+    print(f"{len(callsigns)} flights, {rounds} rounds, one every {tick:.2f}s wall time\n")
+
+    def poll(callsign):
+        t0 = time.perf_counter()
+        r = flask_app.test_client().get(f"/api/flight/{callsign}")
+        return r.status_code, (time.perf_counter() - t0) * 1000
+
+    latencies = []
+    statuses = {}
+    list_ms = []
+    behind = 0
+
+    started = time.perf_counter()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for n in range(rounds):
+                for code, ms in pool.map(poll, callsigns):
+                    statuses[code] = statuses.get(code, 0) + 1
+                    latencies.append(ms)
+
+                t0 = time.perf_counter()
+                client.get("/api/trips")
+                list_ms.append((time.perf_counter() - t0) * 1000)
+
+                # keep rounds on the replay clock; count the ones that overran it
+                wait = started + (n + 1) * tick - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                else:
+                    behind += 1
+    finally:
+        for trip_id in trip_ids:
+            client.post(f"/api/end-trip/{trip_id}")
+
+    elapsed = time.perf_counter() - started
+    q = statistics.quantiles(latencies, n=100)
+
+    print(f"wall time           {elapsed:8.1f} s")
+    print(f"/api/flight calls   {len(latencies):8d}   {len(latencies) / elapsed:8.1f} /s")
+    print(f"  p50 / p95 / p99   {q[49]:8.2f} {q[94]:8.2f} {q[98]:8.2f} ms")
+    print(f"  status codes      {statuses}")
+    print(f"/api/trips p50      {statistics.median(list_ms):8.2f} ms")
+    print(f"alerts raised       {count_alerts(app) - alerts_before:8d}")
+    print(f"rounds behind clock {behind:8d} / {rounds}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# SKYBRIDGE — In-memory active fleet index
+#
+# Holds every non-ENDED trip so the status sync can answer
+# "latest active trip for this callsign" with dict lookups
+# instead of re-querying the trips table.
+#
+# Memory budget: MEMORY_BUDGET_BYTES for 100k active trips
+# (slotted record + per-callsign id array + strings), checked by
+# benchmarks/bench_fleet_index.py.
+#
+# Each worker process keeps its own copy, so it is a cache, not the
+# source of truth: the status sync checks MAX(id) per callsign before
+# trusting it (another worker may have added or ended a trip), every
+# UPDATE carries its own guard in SQL, and a rowcount that disagrees
+# with the index reloads that callsign. reconcile() catches the rest.
+
+import sys
+import time
+import threading
+from array import array
+from bisect import insort
+
+# Columns loaded by warm() / reconcile(), in row order
+COLUMNS = (
+    "id",
+    "callsign",
+    "travel_date",
+    "status",
+    "dep_time",
+    "arr_time",
+    "from_terminal",
+    "to_terminal",
+    "leader_name"
+)
+
+WARM_SQL = (
+    "SELECT " + ", ".join(COLUMNS) +
+    " FROM trips WHERE status != 'ENDED'"
+)
+
+MEMORY_BUDGET_BYTES = 32 * 1024 * 1024
+
+# values that repeat across the fleet; leader names are left alone
+INTERNED = frozenset((
+    "callsign",
+    "travel_date",
+    "status",
+    "dep_time",
+    "arr_time",
+    "from_terminal",
+    "to_terminal"
+))
+
+
+def _intern(name, value):
+    if name in INTERNED and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class TripRecord:
+
+    __slots__ = COLUMNS
+
+    def __init__(self, *values):
+        for name, value in zip(COLUMNS, values):
+            setattr(self, name, _intern(name, value))
+
+    def as_row(self):
+        return tuple(getattr(self, name) for name in COLUMNS)
+
+
+class FleetIndex:
+
+    def __init__(self):
+        self._trips = {}         # trip id -> TripRecord
+        self._by_callsign = {}   # callsign -> array of trip ids, ascending
+        self._lock = threading.Lock()
+        self.warmed = False
+        self.reconciled_at = 0.0
+
+    def __len__(self):
+        return len(self._trips)
+
+    # -------------------- READS --------------------
+
+    def latest(self, callsign):
+        ids = self._by_callsign.get(callsign)
+        if not ids:
+            return None
+        return self._trips.get(ids[-1])
+
+    def get(self, trip_id):
+        return self._trips.get(trip_id)
+
+    def active(self, callsign):
+        with self._lock:
+            return [self._trips[i] for i in self._by_callsign.get(callsign, ())]
+
+    # -------------------- WRITES --------------------
+
+    def upsert(self, row):
+        record = TripRecord(*row)
+
+        with self._lock:
+            self._drop(record.id)
+            self._put(record)
+
+        return record
+
+    def update(self, trip_id, **fields):
+        with self._lock:
+            record = self._trips.get(trip_id)
+            if record is None:
+                return None
+
+            old_callsign = record.callsign
+
+            for name, value in fields.items():
+                setattr(record, name, _intern(name, value))
+
+            if record.callsign != old_callsign:
+                self._unlink(old_callsign, trip_id)
+                self._link(record.callsign, trip_id)
+
+            return record
+
+    def set_status(self, callsign, status, among=None):
+        # mirrors: UPDATE trips SET status = ?
+        #          WHERE callsign = ? AND status != 'ENDED' [AND status IN among]
+        status = _intern("status", status)
+
+        with self._lock:
+            for trip_id in self._by_callsign.get(callsign, ()):
+                record = self._trips[trip_id]
+                if among is None or record.status in among:
+                    record.status = status
+
+    def replace_callsign(self, callsign, rows):
+        # swap in the DB's view of one callsign's active trips
+        records = [TripRecord(*row) for row in rows]
+
+        with self._lock:
+            for trip_id in list(self._by_callsign.get(callsign, ())):
+                self._drop(trip_id)
+
+            for record in records:
+                self._drop(record.id)
+                self._put(record)
+
+    def remove(self, trip_id):
+        with self._lock:
+            return self._drop(trip_id)
+
+    # -------------------- BULK --------------------
+
+    def warm(self, rows):
+        trips, by_callsign = self._build(rows)
+
+        with self._lock:
+            self._trips = trips
+            self._by_callsign = by_callsign
+            self.warmed = True
+            self.reconciled_at = time.time()
+
+    def reconcile(self, rows):
+        # swap in a fresh snapshot, return how many trips had drifted
+        trips, by_callsign = self._build(rows)
+
+        with self._lock:
+            drift = len(self._trips.keys() ^ trips.keys())
+            for trip_id in self._trips.keys() & trips.keys():
+                if self._trips[trip_id].as_row() != trips[trip_id].as_row():
+                    drift += 1
+
+            self._trips = trips
+            self._by_callsign = by_callsign
+            self.warmed = True
+            self.reconciled_at = time.time()
+
+        return drift
+
+    # -------------------- INTERNAL --------------------
+
+    def _build(self, rows):
+        trips = {}
+        by_callsign = {}
+
+        for row in rows:
+            record = TripRecord(*row)
+            trips[record.id] = record
+            by_callsign.setdefault(record.callsign, []).append(record.id)
+
+        return trips, {
+            callsign: array("q", sorted(ids))
+            for callsign, ids in by_callsign.items()
+        }
+
+    def _put(self, record):
+        self._trips[record.id] = record
+        self._link(record.callsign, record.id)
+
+    def _drop(self, trip_id):
+        record = self._trips.pop(trip_id, None)
+        if record is not None:
+            self._unlink(record.callsign, trip_id)
+        return record
+
+    def _link(self, callsign, trip_id):
+        ids = self._by_callsign.get(callsign)
+        if ids is None:
+            ids = self._by_callsign[callsign] = array("q")
+        insort(ids, trip_id)
+
+    def _unlink(self, callsign, trip_id):
+        ids = self._by_callsign.get(callsign)
+        if ids is None:
+            return
+
+        try:
+            ids.remove(trip_id)
+        except ValueError:
+            return
+
+        if not ids:
+            del self._by_callsign[callsign]
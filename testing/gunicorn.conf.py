@@ -0,0 +1,25 @@
+# SKYBRIDGE — gunicorn settings (picked up automatically from this directory)
+#
+# /api/flight admission control is per worker process: the upstream cap
+# only sheds load when a worker serves several requests at once, so
+# threaded workers are required. Rate limits are split across the
+# worker count, which post_fork hands to app.load_settings.
+#
+# Behind a reverse proxy set TRUSTED_PROXY_HOPS (e.g. 1) so clients are
+# keyed by X-Forwarded-For; leave it unset when exposed directly.
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+# slow upstream calls are capped at 12 s, leave room for the DB writes
+timeout = 30
+
+
+def post_fork(server, worker):
+    # the app divides its rate limits by this; keep it in step with -w / workers
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
@@ -0,0 +1,96 @@
+# SKYBRIDGE — Rate limiting & admission control
+#
+# RateLimiter  → token bucket per key (client address, callsign)
+# UpstreamGate → cap on concurrent upstream syncs, never queues
+# Counters     → shed / served tallies for /api/admission
+#
+# All state is per worker process (see gunicorn.conf.py / app.load_settings).
+
+import math
+import time
+import threading
+from collections import OrderedDict
+
+
+class TokenBucket:
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+
+    def __init__(self, per_minute, burst, max_keys=10000):
+        self.rate = per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_keys = max_keys
+
+        # least recently used first, so idle keys are evicted first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        # returns (allowed, retry_after_seconds)
+        if self.rate <= 0:
+            return True, 0
+
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(
+                    self.burst,
+                    bucket.tokens + (now - bucket.updated) * self.rate
+                )
+                bucket.updated = now
+
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return True, 0
+
+            retry_after = math.ceil((1 - bucket.tokens) / self.rate)
+            return False, max(retry_after, 1)
+
+
+class UpstreamGate:
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self):
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class Counters:
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,302 @@
+# SKYBRIDGE — AviationStack record / replay layer
+#
+# live   → plain HTTP call to AviationStack (default)
+# record → live call + response appended to a gzip JSONL file,
+#          one file per process and day, compressed in batches
+# replay → no network, responses served from recorded files,
+#          time-shifted onto the requested travel date
+
+import os
+import glob
+import gzip
+import json
+import time
+import zlib
+import atexit
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timezone
+
+MODES = ("live", "record", "replay")
+
+# record mode: frames per gzip member / max seconds a frame waits in memory
+FLUSH_FRAMES = 200
+FLUSH_SECONDS = 60
+
+# timestamp fields inside departure / arrival that follow the travel date
+TIME_FIELDS = (
+    "scheduled",
+    "estimated",
+    "actual",
+    "estimated_runway",
+    "actual_runway"
+)
+
+
+# -------------------------------------------------
+# LIVE
+# -------------------------------------------------
+
+def http():
+    # requests / urllib3 load on first outbound call, not at import
+    import requests
+    import urllib3
+
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    return requests
+
+class LiveClient:
+
+    mode = "live"
+
+    def get(self, endpoint, params, timeout=12):
+        r = http().get(
+            endpoint,
+            params=params,
+            timeout=timeout,
+            verify=False
+        )
+        r.raise_for_status()
+        return r.json()
+
+
+# -------------------------------------------------
+# RECORD
+# -------------------------------------------------
+
+class RecordingClient(LiveClient):
+
+    mode = "record"
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+        # buffered frames for the current file, written as one gzip member
+        self._path = None
+        self._lines = []
+        self._oldest = 0.0
+
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.flush)
+
+    def path_for(self, ts):
+        # pid keeps gunicorn workers from appending to the same file
+        day = datetime.fromtimestamp(ts, timezone.utc).strftime("%Y%m%d")
+        return os.path.join(
+            self.directory,
+            f"aviationstack-{day}-{os.getpid()}.jsonl.gz"
+        )
+
+    def get(self, endpoint, params, timeout=12):
+        payload = super().get(endpoint, params, timeout)
+
+        ts = time.time()
+
+        # never write the API key to disk
+        frame = {
+            "t": round(ts, 3),
+            "params": {k: v for k, v in params.items() if k != "access_key"},
+            "body": payload
+        }
+        line = json.dumps(frame, separators=(",", ":")) + "\n"
+
+        path = self.path_for(ts)
+
+        with self._lock:
+            # new day (or forked worker) → close out the previous batch
+            if path != self._path:
+                self._flush()
+                self._path = path
+
+            if not self._lines:
+                self._oldest = ts
+            self._lines.append(line)
+
+            if len(self._lines) >= FLUSH_FRAMES or ts - self._oldest >= FLUSH_SECONDS:
+                self._flush()
+
+        return payload
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._lines:
+            return
+
+        lines, self._lines = self._lines, []
+
+        try:
+            # each flush appends one gzip member, gzip reads them back as one stream
+            with gzip.open(self._path, "at", encoding="utf-8") as fh:
+                fh.write("".join(lines))
+        except OSError as e:
+            print("Replay record error:", e)
+
+
+# -------------------------------------------------
+# REPLAY
+# -------------------------------------------------
+
+class ReplayClient:
+
+    mode = "replay"
+
+    def __init__(self, directory, speed=1.0):
+        if speed <= 0:
+            raise ValueError("replay speed must be positive")
+
+        self.directory = directory
+        self.speed = speed
+
+        # flight_iata -> ([t, ...], [body, ...]) sorted by t
+        self._frames = {}
+        self.origin = None
+
+        self.load()
+        self.started = time.time()
+
+    def load(self):
+        frames = {}
+        origin = None
+
+        files = sorted(glob.glob(os.path.join(self.directory, "*.jsonl.gz")))
+
+        for path in files:
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as fh:
+                    for line in fh:
+                        if not line.strip():
+                            continue
+
+                        try:
+                            frame = json.loads(line)
+                            key = (frame.get("params", {}).get("flight_iata") or "").upper()
+                            t, body = float(frame["t"]), frame["body"]
+                        except (ValueError, KeyError, TypeError, AttributeError):
+                            print("Replay skipped bad frame in", path)
+                            continue
+
+                        frames.setdefault(key, []).append((t, body))
+
+                        if origin is None or t < origin:
+                            origin = t
+
+            # truncated member (worker killed mid-write) → keep what was read
+            except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+                print("Replay skipped rest of", path, "-", e)
+
+        self._frames = {}
+        for key, items in frames.items():
+            items.sort(key=lambda item: item[0])
+            self._frames[key] = (
+                [t for t, _ in items],
+                [body for _, body in items]
+            )
+
+        self.origin = origin
+
+        print("Replay loaded:", len(files), "files,", len(self._frames), "flights")
+
+    def flights(self):
+        # flight numbers with at least one recorded response
+        return sorted(key for key in self._frames if key)
+
+    def clock(self):
+        # recorded timeline position, advancing `speed` times faster than wall time
+        if self.origin is None:
+            return 0
+        return self.origin + (time.time() - self.started) * self.speed
+
+    def get(self, endpoint, params, timeout=12):
+        key = (params.get("flight_iata") or "").upper()
+        frames = self._frames.get(key)
+
+        if not frames:
+            return {"data": []}
+
+        times, bodies = frames
+
+        # latest response recorded before "now"; before the first one, serve the first
+        i = max(bisect_right(times, self.clock()) - 1, 0)
+
+        return shift_payload(bodies[i], params.get("flight_date"))
+
+
+# -------------------------------------------------
+# TIME SHIFT
+# -------------------------------------------------
+
+def shift_payload(payload, travel_date):
+    data = payload.get("data") or []
+
+    if not travel_date:
+        return {"data": [dict(f) for f in data]}
+
+    try:
+        target = date.fromisoformat(travel_date)
+    except ValueError:
+        return {"data": [dict(f) for f in data]}
+
+    return {"data": [shift_record(f, target) for f in data]}
+
+
+def shift_record(record, target):
+    record = dict(record)
+
+    try:
+        recorded = date.fromisoformat(record.get("flight_date") or "")
+    except ValueError:
+        return record
+
+    offset = target - recorded
+    if not offset:
+        return record
+
+    record["flight_date"] = target.isoformat()
+
+    for side in ("departure", "arrival"):
+        leg = record.get(side)
+        if not leg:
+            continue
+
+        leg = dict(leg)
+        for field in TIME_FIELDS:
+            if field in leg:
+                leg[field] = shift_timestamp(leg[field], offset)
+        record[side] = leg
+
+    return record
+
+
+def shift_timestamp(value, offset):
+    if not value:
+        return value
+
+    try:
+        return (datetime.fromisoformat(value) + offset).isoformat()
+    except (TypeError, ValueError):
+        return value
+
+
+# -------------------------------------------------
+# FACTORY
+# -------------------------------------------------
+
+def build_client(mode=None, directory=None, speed=1.0):
+    mode = (mode or "live").strip().lower()
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown replay mode: {mode}")
+
+    if mode == "live":
+        return LiveClient()
+
+    directory = directory or "recordings"
+
+    if mode == "record":
+        return RecordingClient(directory)
+
+    return ReplayClient(directory, speed=float(speed))
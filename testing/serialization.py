@@ -0,0 +1,97 @@
+# SKYBRIDGE — Fast JSON + compressed responses for list endpoints
+#
+# orjson / brotli (requirements-optional.txt) are used when installed,
+# stdlib json / gzip otherwise.
+
+import gzip
+import json
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# smaller bodies are not worth the CPU
+MIN_COMPRESS_BYTES = 1024
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+# -------------------------------------------------
+# JSON
+# -------------------------------------------------
+
+def dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# -------------------------------------------------
+# SHAPES
+# -------------------------------------------------
+
+def as_records(columns, rows):
+    # today's shape: one object per row
+    return [dict(zip(columns, r)) for r in rows]
+
+
+def as_columnar(columns, rows):
+    # keys once, one value array per column
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {
+        "columns": {name: list(col) for name, col in zip(columns, values)},
+        "count": len(rows)
+    }
+
+
+def shape_rows(columns, rows, shape):
+    if shape == "columnar":
+        return as_columnar(columns, rows)
+    return as_records(columns, rows)
+
+
+# -------------------------------------------------
+# COMPRESSION
+# -------------------------------------------------
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def negotiate(accept_encodings):
+    # werkzeug's Accept header object honours q-values, including q=0
+    return accept_encodings.best_match(ENCODINGS)
+
+
+# -------------------------------------------------
+# RESPONSE
+# -------------------------------------------------
+
+def json_response(payload, status=200):
+    body = dumps(payload)
+
+    resp = Response(body, status=status, mimetype="application/json")
+    resp.vary.add("Accept-Encoding")
+
+    if len(body) < MIN_COMPRESS_BYTES:
+        return resp
+
+    encoding = negotiate(request.accept_encodings)
+    if encoding:
+        resp.set_data(compress(body, encoding))
+        resp.headers["Content-Encoding"] = encoding
+
+    return resp
@@ -306,6 +306,14 @@ async function endTrip(id) {
 async function focusFlight(callsign, leader, id) {
 
   const res = await fetch(`/api/flight/${callsign}`);
+
+  // ⏳ Rate limited → keep current card as-is
+  if (res.status === 429) {
+    const wait = res.headers.get("Retry-After") || "a few";
+    alert(`Too many refreshes. Try again in ${wait} seconds.`);
+    return;
+  }
+
   const data = await res.json();
 
   // Always clear previous marker